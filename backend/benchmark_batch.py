@@ -0,0 +1,86 @@
+"""
+Benchmark: N chiamate sequenziali a GET /search/{question} contro una sola POST /search/batch.
+
+Richiede il backend in esecuzione (default http://localhost:8003, sovrascrivibile con BACKEND_URL):
+    python benchmark_batch.py [ripetizioni]
+"""
+import json
+import os
+import sys
+import time
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+BASE_URL = os.getenv("BACKEND_URL", "http://localhost:8003")
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "data.tsv")
+
+
+def load_questions() -> list:
+    """
+    Costruisce le domande di una pagina dashboard (un anno, un genere, una piattaforma per volta)
+    a partire dai valori presenti in data.tsv, così che ogni domanda restituisca delle righe.
+    """
+    with open(DATA_PATH) as file:
+        rows = [line.rstrip("\n").split("\t") for line in file][1:]
+    years = sorted({row[3] for row in rows})
+    genres = sorted({row[4] for row in rows})
+    platforms = sorted({platform for row in rows for platform in row[5:7] if platform})
+    return (
+        [f"Elenca i film del {year}" for year in years]
+        + [f"Elenca tutti i film di {genre}." for genre in genres]
+        + [f"Quali sono i registi presenti su {platform}?" for platform in platforms]
+        + ["Quali registi hanno fatto più di un film?"]
+    )
+
+
+QUESTIONS = load_questions()
+
+
+def run_sequential() -> list:
+    """
+    Esegue le domande una alla volta tramite GET /search/{question}.
+    """
+    results = []
+    for question in QUESTIONS:
+        with urlopen(f"{BASE_URL}/search/{quote(question)}") as response:
+            results.append(json.load(response))
+    return results
+
+
+def run_batch() -> list:
+    """
+    Esegue tutte le domande con una singola POST /search/batch.
+    """
+    body = json.dumps({"questions": QUESTIONS}).encode()
+    request = Request(f"{BASE_URL}/search/batch", data=body, headers={"Content-Type": "application/json"})
+    with urlopen(request) as response:
+        return [entry["results"] for entry in json.load(response)]
+
+
+def timed(function, repetitions: int) -> float:
+    """
+    Restituisce il tempo medio (in ms) di `repetitions` esecuzioni di `function`.
+    """
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) * 1000 / repetitions
+
+
+if __name__ == "__main__":
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    # Le due modalità devono restituire gli stessi risultati, non vuoti, per ogni domanda
+    sort_key = lambda item: json.dumps(item, sort_keys=True)
+    for question, single, batch in zip(QUESTIONS, run_sequential(), run_batch()):
+        if not single:
+            sys.exit(f"Nessun risultato per la domanda: {question}")
+        if sorted(single, key=sort_key) != sorted(batch, key=sort_key):
+            sys.exit(f"Risultati diversi per la domanda: {question}")
+
+    sequential_ms = timed(run_sequential, repetitions)
+    batch_ms = timed(run_batch, repetitions)
+    print(f"{len(QUESTIONS)} domande, {repetitions} ripetizioni")
+    print(f"sequenziale: {sequential_ms:8.2f} ms")
+    print(f"batch:       {batch_ms:8.2f} ms  (x{sequential_ms / batch_ms:.1f})")
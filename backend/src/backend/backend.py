@@ -1,11 +1,15 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 import mariadb
+import os
+import time
 
 from db_manager.DatabaseManager import DatabaseManager
 from query_handler.QueryHandler import QueryHandler
+from profiling.SlowQueryLog import SlowQueryLog, profile_call
 
 # Inizializzazione FastAPI
 app = FastAPI(title="Text2SQL-server")
@@ -30,7 +34,14 @@ if not db_manager.is_init():
         raise RuntimeError(f"Errore inizializzazione database: {e}")
 
 #Inizializzazione del gestore delle query
-query_handler = QueryHandler()
+query_handler = QueryHandler(db_manager)
+
+#Registro delle richieste lente
+slow_log = SlowQueryLog()
+
+# Strumenti diagnostici, disattivati di default: espongono domande, parametri e piani di esecuzione
+profiling_enabled = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+admin_endpoints = os.getenv("ADMIN_ENDPOINTS", "false").lower() == "true"
 
 
 
@@ -50,6 +61,82 @@ class SearchResult(BaseModel):
 class DataInput(BaseModel):
     data_line: str
 
+class BatchInput(BaseModel):
+    questions: list[str]
+
+class BatchSearchResult(BaseModel):
+    question: str
+    results: list[SearchResult]
+    error: Optional[str] = None
+
+class SlowQuery(BaseModel):
+    timestamp: str
+    question: str
+    template: str
+    params: list[str]
+    connection: str
+    timings_ms: Dict[str, float]
+    row_count: int
+    explain: Optional[str]
+
+
+# -- MIDDLEWARE --
+
+#Misura la durata delle search, registra quelle lente e allega l'eventuale profilazione
+@app.middleware("http")
+async def slow_request_log(request: Request, call_next):
+    """
+    Middleware per la registrazione delle richieste di search più lente della soglia configurata.
+
+    :param request: Oggetto Request di FastAPI che rappresenta la richiesta HTTP.
+    :param call_next: Handler successivo della catena.
+    :return: La risposta dell'endpoint, con l'header 'X-Profile-Summary' se la profilazione è stata richiesta.
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+
+    # Solo le search valorizzano la traccia: le altre richieste passano senza costi aggiuntivi
+    trace = getattr(request.state, "search_trace", None)
+    if trace is None:
+        return response
+
+    profile = getattr(request.state, "profile", None)
+    if profile is not None:
+        response.headers["X-Profile-Summary"] = " | ".join(profile)
+
+    total_ms = (time.perf_counter() - start) * 1000
+    if "sql" in trace and slow_log.is_slow(total_ms):
+        timings = trace["timings_ms"]
+        # Tempo non attribuibile alle singole fasi: serializzazione della risposta e routing
+        timings["serialization"] = total_ms - sum(timings.values())
+        timings["total"] = total_ms
+        # Il piano viene catturato dopo l'invio della risposta, per non rallentare il client
+        response.background = BackgroundTask(record_slow_query, trace)
+    return response
+
+
+#Registrazione di una search lenta con il relativo piano di esecuzione
+def record_slow_query(trace: Dict[str, Any]) -> None:
+    """
+    Cattura il piano di esecuzione sulla stessa connessione che ha eseguito la query e registra la richiesta.
+
+    :param trace: Traccia della search compilata da QueryHandler.execute_query.
+    """
+    try:
+        explain = db_manager.explain_query(trace["sql"], trace["params"], slow_log.analyze, trace["connection"])
+    except mariadb.Error as e:
+        explain = f"Piano non disponibile: {e}"
+
+    slow_log.record({
+        "question": trace["question"],
+        "template": trace["template"],
+        "params": list(trace["params"]),
+        "connection": trace["connection"],
+        "timings_ms": trace["timings_ms"],
+        "row_count": trace["row_count"],
+        "explain": explain,
+    })
+
 
 # -- ENDPOINTS --
 
@@ -63,13 +150,13 @@ def schema_summary() -> List[Dict[str, Any]]:
     """
     try:
         # execute_query per eseguire le query "SHOW TABLES"
-        tables = db_manager.execute_query("SHOW TABLES",return_columns=False)
+        tables = db_manager.execute_query("SHOW TABLES",return_columns=False,read_only=True)
 
         schema = []
 
         for (table_name,) in tables:
             # execute_query per eseguire la query "SHOW COLUMS from table_name"
-            columns = db_manager.execute_query(f"SHOW COLUMNS FROM {table_name}",return_columns=False)
+            columns = db_manager.execute_query(f"SHOW COLUMNS FROM {table_name}",return_columns=False,read_only=True)
             for column in columns:
                 #Organizzazione nel formato JSON richiesto
                 schema.append({"table_name": table_name, "table_column": column[0]})
@@ -82,15 +169,52 @@ def schema_summary() -> List[Dict[str, Any]]:
 
 #Metodo get per la search nel database data una question in linguaggio naturale 
 @app.get("/search/{question}", response_model=List[SearchResult])
-def search(question: str) -> List[Dict[str, Any]]:
+def search(question: str, request: Request) -> List[Dict[str, Any]]:
     """
     Endpoint per eseguire una query basata su una domanda in linguaggio naturale.
+    Se PROFILING_ENABLED è attivo, con l'header 'X-Profile' la richiesta viene profilata
+    e il riepilogo restituito in 'X-Profile-Summary'.
 
     :param question: La domanda in linguaggio naturale.
+    :param request: Oggetto Request di FastAPI che rappresenta la richiesta HTTP.
     :return: I risultati della query formattati.
     """
-    return query_handler.execute_query(question)
-    
+    # Traccia letta dal middleware per il registro delle richieste lente
+    trace = {"question": question}
+    request.state.search_trace = trace
+
+    if not profiling_enabled or "X-Profile" not in request.headers:
+        return query_handler.execute_query(question, trace)
+
+    results, request.state.profile = profile_call(query_handler.execute_query, question, trace)
+    return results
+
+
+#Metodo post per la search di più domande, raggruppate per template in un'unica query
+@app.post("/search/batch", response_model=List[BatchSearchResult])
+def search_batch(input_data: BatchInput) -> List[Dict[str, Any]]:
+    """
+    Endpoint per eseguire più domande in linguaggio naturale con un round trip per template.
+    Una domanda non riconosciuta non fa fallire le altre: riceve risultati vuoti e il campo 'error'.
+
+    :param input_data: Dati in formato JSON con la lista delle domande.
+    :return: Per ogni domanda, nello stesso ordine, i risultati della query formattati.
+    """
+    return query_handler.execute_batch(input_data.questions)
+
+
+#Metodo get per la consultazione del registro delle richieste lente
+@app.get("/admin/slow_queries", response_model=List[SlowQuery])
+def slow_queries() -> List[Dict[str, Any]]:
+    """
+    Endpoint per visualizzare le search più lente della soglia configurata (solo con ADMIN_ENDPOINTS attivo).
+
+    :return: Le richieste registrate, dalla più recente alla più vecchia.
+    """
+    if not admin_endpoints:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return slow_log.entries()
+
 
 #Metodo post per aggiunta di dati al database   
 @app.post("/add")
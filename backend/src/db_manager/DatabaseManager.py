@@ -1,14 +1,17 @@
 import mariadb
 import time
 import os
-from typing import List, Optional, Tuple
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from fastapi import HTTPException
 
 
 class DatabaseManager:
     def __init__(self) -> None:
         """
-        Inizializza la connessione al database.
+        Inizializza i pool di connessioni verso il database primario e le eventuali repliche in lettura.
         I parametri di connessione sono letti da variabili di ambiente.
         """
 
@@ -19,40 +22,226 @@ class DatabaseManager:
         db_password = os.getenv("DB_PASSWORD", "pwd")
         db_name = os.getenv("DB_NAME", "movies_db")
 
-        self.connection = mariadb.connect(
-                    user=db_user,
-                    password=db_password,
-                    host=db_host,
-                    port=db_port,
-                    database=db_name
+        # Parametri comuni a primario e repliche (cambiano solo host e porta)
+        self.connection_params = {"user": db_user, "password": db_password, "database": db_name}
+        # Connessioni per pool: ogni thread usa la propria, senza interlacciare statement
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", 5))
+        self._pool_names = itertools.count()
+
+        # Pool del primario: riceve tutte le scritture
+        self.primary = self._new_target("primary", db_host, db_port)
+        self.primary["pool"] = self._create_pool(self.primary)
+
+        # Secondi per cui una replica guasta resta esclusa dal giro
+        self.replica_cooldown = float(os.getenv("DB_REPLICA_COOLDOWN", 30))
+        # Finestra read-your-writes: dopo una scrittura le letture restano sul primario.
+        # Il timestamp è unico per il processo (vale per tutti i client, non tra più worker)
+        self.sticky_window = float(os.getenv("DB_STICKY_WINDOW", 5))
+        self.last_write = float("-inf")
+
+        # Repliche in lettura, es. DB_REPLICAS="replica1:3306,replica2:3306" (opzionale)
+        self.replicas = []
+        for dsn in filter(None, (entry.strip() for entry in os.getenv("DB_REPLICAS", "").split(","))):
+            host, _, port = dsn.partition(":")
+            replica = self._new_target(dsn, host, int(port or db_port))
+            self._connect_replica(replica)
+            self.replicas.append(replica)
+
+        self._next_replica = 0
+        self._replica_lock = threading.Lock()
+
+
+    #Descrittore di un server (primario o replica)
+    def _new_target(self, name: str, host: str, port: int) -> Dict[str, Any]:
+        """
+        Crea il descrittore di un server del database.
+
+        :param name: Nome del server (es. "primary" o "host:porta").
+        :param host: Host del server.
+        :param port: Porta del server.
+        :return: Dizionario con pool, semaforo delle connessioni libere e stato della replica.
+        """
+        return {"name": name, "host": host, "port": port, "pool": None,
+                "slots": threading.BoundedSemaphore(self.pool_size),
+                "ejected_until": 0.0, "reconnecting": False}
+
+    #Creazione del pool di connessioni verso un server
+    def _create_pool(self, target: Dict[str, Any]) -> mariadb.ConnectionPool:
+        """
+        Crea un pool di connessioni verso il server indicato.
+
+        :param target: Descrittore del server.
+        :return: Il pool di connessioni.
+        """
+        # I nomi dei pool sono globali nel connettore: un nome nuovo ad ogni (ri)creazione
+        return mariadb.ConnectionPool(
+                    pool_name=f"{target['name']}-{next(self._pool_names)}",
+                    pool_size=self.pool_size,
+                    host=target["host"],
+                    port=target["port"],
+                    **self.connection_params
         )
 
+    #Prestito di una connessione dal pool
+    @contextmanager
+    def _connection(self, target: Dict[str, Any]) -> Iterator[mariadb.Connection]:
+        """
+        Prende in prestito una connessione dal pool del server e la restituisce a fine uso.
+        Se il pool è esaurito attende che una connessione si liberi.
+
+        :param target: Descrittore del server.
+        """
+        with target["slots"]:
+            connection = target["pool"].get_connection()
+            try:
+                yield connection
+            finally:
+                connection.close()
+
+    #Connessione (o riconnessione) ad una replica
+    def _connect_replica(self, replica: Dict[str, Any]) -> bool:
+        """
+        Ricrea il pool verso una replica; in caso di errore la replica viene esclusa.
+
+        :param replica: Descrittore della replica.
+        :return: True se la replica è disponibile, False altrimenti.
+        """
+        try:
+            if replica["pool"] is not None:
+                replica["pool"].close()
+            replica["pool"] = None
+            replica["pool"] = self._create_pool(replica)
+            replica["ejected_until"] = 0.0
+            return True
+        except mariadb.Error as e:
+            self._eject_replica(replica, e)
+            return False
+        finally:
+            replica["reconnecting"] = False
+
+    #Esclusione temporanea di una replica non raggiungibile
+    def _eject_replica(self, replica: Dict[str, Any], error: Exception) -> None:
+        """
+        Esclude una replica dal round-robin per `replica_cooldown` secondi.
+
+        :param replica: Descrittore della replica.
+        :param error: Errore che ha causato l'esclusione.
+        """
+        replica["ejected_until"] = time.monotonic() + self.replica_cooldown
+        print(f"DEBUG: Replica '{replica['name']}' esclusa: {error}")
+
+    #Scelta della replica per una lettura
+    def _pick_replica(self) -> Optional[Dict[str, Any]]:
+        """
+        Sceglie in round-robin una replica sana per una lettura.
+
+        :return: Il descrittore della replica, oppure None se la lettura deve andare al primario
+                 (nessuna replica disponibile o finestra read-your-writes ancora aperta).
+        """
+        if not self.replicas or time.monotonic() - self.last_write < self.sticky_window:
+            return None
+
+        reconnect = None
+        with self._replica_lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[self._next_replica]
+                self._next_replica = (self._next_replica + 1) % len(self.replicas)
+
+                if replica["reconnecting"] or replica["ejected_until"] > time.monotonic():
+                    continue
+                if replica["ejected_until"]:
+                    # Cooldown scaduto: un solo thread la riconnette, gli altri la saltano
+                    replica["reconnecting"] = True
+                    reconnect = replica
+                    break
+                return replica
+
+        # La riconnessione avviene fuori dal lock, per non bloccare le altre letture
+        if reconnect is not None and self._connect_replica(reconnect):
+            return reconnect
+        return None
+
 
     #Esecuzione della query
-    def execute_query(self, query: str, params: tuple = None, return_columns: bool = True) -> Tuple[list[tuple], Optional[List[str]]]:
+    def execute_query(self, query: str, params: tuple = None, return_columns: bool = True, read_only: bool = False, trace: Optional[Dict[str, Any]] = None) -> Tuple[list[tuple], Optional[List[str]]]:
         """
         Esegue una query sul database e restituisce i risultati.
 
         :param query: La stringa della query SQL da eseguire.
         :param params: Una tupla contenente i parametri della query (opzionale).
         :param return_columns: Specifica se restituire anche i nomi delle colonne della tabella (opzionale, default: True).
+        :param read_only: Se True la query può essere servita da una replica (opzionale, default: False).
+        :param trace: Dizionario in cui registrare il server che ha eseguito la query (opzionale).
 
         :return: Se `return_columns` è True, restituisce una tupla contenente:
                 - result: Una lista di tuple con i risultati della query.
                 - column_names: Una lista con i nomi delle colonne della tabella.
                 Se `return_columns` è False, restituisce solo `result`.
         """
-        cursor: mariadb.Cursor = self.connection.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        result = cursor.fetchall()
-        column_names = [desc[0] for desc in cursor.description] if return_columns else None
-        self.connection.commit()
-        cursor.close()
+        if read_only:
+            replica = self._pick_replica()
+            if replica is not None:
+                try:
+                    result = self._run_query(replica, query, params, return_columns)
+                    if trace is not None:
+                        trace["connection"] = replica["name"]
+                    return result
+                except (mariadb.OperationalError, mariadb.InterfaceError) as e:
+                    # Replica non raggiungibile: esclusione e fallback sul primario
+                    self._eject_replica(replica, e)
+
+        result = self._run_query(self.primary, query, params, return_columns)
+        if trace is not None:
+            trace["connection"] = self.primary["name"]
+        return result
+
+    #Esecuzione della query su uno specifico server
+    def _run_query(self, target: Dict[str, Any], query: str, params: tuple, return_columns: bool) -> Tuple[list[tuple], Optional[List[str]]]:
+        """
+        Esegue la query su una connessione del server indicato (primario o replica).
+
+        :param target: Descrittore del server su cui eseguire la query.
+        :param query: La stringa della query SQL da eseguire.
+        :param params: Una tupla contenente i parametri della query.
+        :param return_columns: Specifica se restituire anche i nomi delle colonne della tabella.
+
+        :return: Vedi `execute_query`.
+        """
+        with self._connection(target) as connection:
+            cursor: mariadb.Cursor = connection.cursor()
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                result = cursor.fetchall()
+                column_names = [desc[0] for desc in cursor.description] if return_columns else None
+                connection.commit()
+            finally:
+                cursor.close()
         return (result, column_names) if return_columns else result
 
+    #Piano di esecuzione di una query
+    def explain_query(self, query: str, params: tuple = None, analyze: bool = False, connection: str = "primary") -> str:
+        """
+        Restituisce il piano di esecuzione di una query in lettura (EXPLAIN, oppure ANALYZE che la riesegue).
+
+        :param query: La stringa della query SQL da analizzare.
+        :param params: Una tupla contenente i parametri della query (opzionale).
+        :param analyze: Se True usa ANALYZE, con i tempi reali dell'esecuzione (opzionale, default: False).
+        :param connection: Nome del server su cui è stata eseguita la query, come registrato da
+                           `execute_query` nella traccia (opzionale, default: "primary").
+
+        :return: Il piano in formato JSON prodotto da MariaDB.
+        """
+        target = next((t for t in [self.primary, *self.replicas] if t["name"] == connection), None)
+        if target is None or target["pool"] is None:
+            return f"Piano non disponibile: server '{connection}' non raggiungibile"
+
+        statement = "ANALYZE" if analyze else "EXPLAIN"
+        result = self._run_query(target, f"{statement} FORMAT=JSON {query}", params, return_columns=False)
+        return "\n".join(row[0] for row in result)
+
     #Esecuzione della query per operazioni nel database (INSERT, UPDATE, ...)
     def execute_db_operation(self, query: str, data: List[tuple]) -> None:
         """
@@ -61,26 +250,29 @@ class DatabaseManager:
         :param query: La stringa della query SQL da eseguire.
         :param data: Una lista di tuple contenenti i valori da utilizzare nella query.
         """
-        cursor: mariadb.Cursor = self.connection.cursor()
-        try:
-            if data:  # Esegui `executemany` solo se `data` non è vuoto
-                cursor.executemany(query, data)
-            else:  # Per query come DELETE senza parametri
-                cursor.execute(query)
-            self.connection.commit()
-        except mariadb.IntegrityError as e:
-            # Gestione specifica per violazione di chiave primaria
-            if "Duplicate entry" in str(e):
-                print(f"DEBUG: Violazione della chiave primaria: {e}")
-                raise HTTPException(status_code=409, detail="Violazione della chiave primaria: il record esiste già.")
-            else:
-                print(f"DEBUG: Errore di integrità del database: {e}")
-                raise HTTPException(status_code=422, detail=f"Errore di integrità del database: {e}")
-        except mariadb.Error as e:
-            print(f"DEBUG: Errore durante l'esecuzione della query '{query}': {e}")
-            raise HTTPException(status_code=500, detail=f"Errore interno del database: {e}")
-        finally:
-            cursor.close()
+        with self._connection(self.primary) as connection:
+            cursor: mariadb.Cursor = connection.cursor()
+            try:
+                if data:  # Esegui `executemany` solo se `data` non è vuoto
+                    cursor.executemany(query, data)
+                else:  # Per query come DELETE senza parametri
+                    cursor.execute(query)
+                connection.commit()
+                # Apre la finestra read-your-writes: le letture successive vanno al primario
+                self.last_write = time.monotonic()
+            except mariadb.IntegrityError as e:
+                # Gestione specifica per violazione di chiave primaria
+                if "Duplicate entry" in str(e):
+                    print(f"DEBUG: Violazione della chiave primaria: {e}")
+                    raise HTTPException(status_code=409, detail="Violazione della chiave primaria: il record esiste già.")
+                else:
+                    print(f"DEBUG: Errore di integrità del database: {e}")
+                    raise HTTPException(status_code=422, detail=f"Errore di integrità del database: {e}")
+            except mariadb.Error as e:
+                print(f"DEBUG: Errore durante l'esecuzione della query '{query}': {e}")
+                raise HTTPException(status_code=500, detail=f"Errore interno del database: {e}")
+            finally:
+                cursor.close()
 
     #Check per tabella del db vuota
     def table_is_empty(self, table: str) -> bool:
@@ -91,7 +283,6 @@ class DatabaseManager:
 
         :return: True se la tabella è vuota (non contiene righe), False altrimenti.
         """
-        self.connection.commit()  # Forza la sincronizzazione della connessione
         result= self.execute_query(f"SELECT COUNT(*) FROM {table}",return_columns=False)
 
         return result[0][0] == 0
@@ -368,12 +559,14 @@ class DatabaseManager:
             raise HTTPException(status_code=500, detail=f"Errore interno: {e}")
         
 
-    #Chiusura della connessione
+    #Chiusura delle connessioni
     def close_connection(self) -> None:
         """
-        Chiude la connessione al database.
+        Chiude i pool di connessioni verso il database e le repliche.
         """
-        self.connection.close()
+        for target in [self.primary, *self.replicas]:
+            if target["pool"] is not None:
+                target["pool"].close()
 
     #Ripulisce il database
     def clear_db(self) -> None:
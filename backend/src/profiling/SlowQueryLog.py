@@ -0,0 +1,74 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List
+
+
+class SlowQueryLog:
+    def __init__(self) -> None:
+        """
+        Registro delle richieste lente, mantenuto in un buffer circolare di dimensione fissa.
+        Soglia e dimensione sono lette da variabili di ambiente.
+        """
+        # Soglia (in millisecondi) oltre la quale una richiesta viene registrata
+        self.threshold_ms = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 500))
+        # Se True, il piano viene catturato con ANALYZE (riesegue la query) invece di EXPLAIN
+        self.analyze = os.getenv("SLOW_QUERY_ANALYZE", "false").lower() == "true"
+
+        self._entries = deque(maxlen=int(os.getenv("SLOW_QUERY_LOG_SIZE", 100)))
+        self._lock = threading.Lock()
+
+    #Check della soglia
+    def is_slow(self, total_ms: float) -> bool:
+        """
+        Verifica se una richiesta supera la soglia configurata.
+
+        :param total_ms: Durata totale della richiesta in millisecondi.
+        :return: True se la richiesta deve essere registrata, False altrimenti.
+        """
+        return total_ms >= self.threshold_ms
+
+    #Aggiunta di una richiesta lenta al registro
+    def record(self, entry: Dict[str, Any]) -> None:
+        """
+        Aggiunge una richiesta al registro; le più vecchie vengono scartate a buffer pieno.
+
+        :param entry: Dizionario con domanda, template, parametri, tempi, righe e piano di esecuzione.
+        """
+        entry["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._entries.append(entry)
+
+    #Getter delle richieste registrate
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        Restituisce le richieste registrate, dalla più recente alla più vecchia.
+
+        :return: Lista di dizionari delle richieste lente.
+        """
+        with self._lock:
+            return list(reversed(self._entries))
+
+
+#Profilazione di una singola richiesta
+def profile_call(function, *args, limit: int = 10, **kwargs):
+    """
+    Esegue `function` sotto cProfile e restituisce il risultato insieme al riepilogo.
+
+    :param function: Funzione da profilare.
+    :param limit: [Opzionale] Numero di funzioni riportate nel riepilogo (default 10)
+    :return: Tupla (risultato della funzione, riepilogo ordinato per tempo cumulativo).
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args, **kwargs)
+
+    summary = []
+    stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats(pstats.SortKey.CUMULATIVE)
+    for (filename, line, name) in stats.fcn_list[:limit]:
+        _, calls, _, cumulative, _ = stats.stats[(filename, line, name)]
+        summary.append(f"{cumulative * 1000:.2f}ms {calls}x {name} ({os.path.basename(filename)}:{line})")
+    return result, summary
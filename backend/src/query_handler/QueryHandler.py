@@ -1,15 +1,20 @@
 import re
-from typing import Any, Dict, List, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi import HTTPException
 from db_manager.DatabaseManager import DatabaseManager
 
 
 class QueryHandler:
-    def __init__(self):
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
         """
         Gestisce la mappatura di query in linguaggio naturale a query SQL e ne formatta i risultati.
+
+        :param db_manager: [Opzionale] DatabaseManager condiviso, così da rispettare la finestra
+                           read-your-writes delle scritture fatte tramite lo stesso manager (default: nuovo manager)
         """
-        self.db_manager = DatabaseManager()
+        self.db_manager = db_manager if db_manager is not None else DatabaseManager()
         # Mapping tra pattern regex, tipo di item e query SQL
         self.query_mapping = {
             r"Elenca i film del (\d{4})": ("film","SELECT title as name,director,year,genre FROM movies WHERE year = ?"),
@@ -34,31 +39,150 @@ class QueryHandler:
                 HAVING COUNT(*) > 1
             """)
 }
+        # Colonna filtrata con "= ?" per i template che possono essere uniti in un'unica query batch
+        self.batch_keys = {
+            r"Elenca i film del (\d{4})": "year",
+            r"Quali sono i registi presenti su (.+)\?": "platform",
+            r"Elenca tutti i film di (.+).": "genre",
+        }
 
-    def match_query(self, question: str) -> Tuple[str, str, Tuple]:
+    def match_pattern(self, question: str) -> Tuple[str, Tuple]:
         """
-        Check del match tra question e query_mapping
+        Check del match tra question e i pattern di query_mapping
 
         :param question: Stringa per il match con query_mapping
-        :return: Se trova il match ritorna il nome della tabella e la query da eseguire
+        :return: Se trova il match ritorna il pattern corrispondente e i parametri estratti
         :raises HTTPException: Se la domanda non corrisponde a nessun pattern.
         """
-        for pattern, (table_name, sql) in self.query_mapping.items():
+        for pattern in self.query_mapping:
             match = re.match(pattern, question)
             if match:
-                return table_name, sql, match.groups()
+                return pattern, match.groups()
         raise HTTPException(status_code=422, detail="Query non riconosciuta")
 
-    def execute_query(self, question: str) -> List[Dict[str, Any]]:
+    def execute_query(self, question: str, trace: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Esegue la query corrispondente alla domanda e formatta il risultato.
 
         :param question: Domanda in linguaggio naturale
+        :param trace: [Opzionale] Dizionario in cui registrare template, query, parametri, server
+                      che l'ha eseguita, numero di righe e tempi (in ms) delle singole fasi (default None)
         :return: Lista di dizionari con chiavi 'item_type' e 'properties'.
         """
-        table_name, sql, params = self.match_query(question)
-        results, columns = self.db_manager.execute_query(sql, params)
-        return self.format_response(table_name, results, columns)
+        start = time.perf_counter()
+        pattern, params = self.match_pattern(question)
+        table_name, sql = self.query_mapping[pattern]
+        matched = time.perf_counter()
+        results, columns = self.db_manager.execute_query(sql, params, read_only=True, trace=trace)
+        executed = time.perf_counter()
+        response = self.format_response(table_name, results, columns)
+
+        if trace is not None:
+            trace.update({
+                "template": pattern,
+                "sql": sql,
+                "params": params,
+                "row_count": len(results),
+                "timings_ms": {
+                    "match_pattern": (matched - start) * 1000,
+                    "execute_query": (executed - matched) * 1000,
+                    "format_response": (time.perf_counter() - executed) * 1000,
+                },
+            })
+        return response
+
+    def execute_batch(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """
+        Esegue un insieme di domande raggruppandole per template: le domande dello stesso
+        template vengono unite in un'unica query (WHERE colonna IN (...)) e le righe
+        vengono poi ridistribuite alle singole domande. I gruppi sono eseguiti in parallelo
+        sul pool di connessioni.
+
+        :param questions: Lista di domande in linguaggio naturale
+        :return: Per ogni domanda (nello stesso ordine) un dizionario con 'question', 'results'
+                 (lista di dizionari con 'item_type' e 'properties') ed 'error' (se la domanda non è riconosciuta).
+        """
+        responses: List[Dict[str, Any]] = [{"question": question, "results": [], "error": None} for question in questions]
+
+        # Raggruppamento delle domande per template; quelle non riconosciute restano con l'errore
+        groups: Dict[str, List[Tuple[int, Tuple]]] = {}
+        for index, question in enumerate(questions):
+            try:
+                pattern, params = self.match_pattern(question)
+            except HTTPException as e:
+                responses[index]["error"] = e.detail
+                continue
+            groups.setdefault(pattern, []).append((index, params))
+
+        if not groups:
+            return responses
+
+        with ThreadPoolExecutor(max_workers=min(len(groups), self.db_manager.pool_size)) as executor:
+            futures = [executor.submit(self._execute_group, pattern, members) for pattern, members in groups.items()]
+            for future in futures:
+                for index, results in future.result().items():
+                    responses[index]["results"] = results
+
+        return responses
+
+    def _execute_group(self, pattern: str, members: List[Tuple[int, Tuple]]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Esegue le domande di un singolo template.
+
+        :param pattern: Pattern di query_mapping comune alle domande del gruppo.
+        :param members: Coppie (indice della domanda, parametri estratti).
+        :return: Dizionario indice della domanda -> risultati formattati.
+        """
+        table_name, sql = self.query_mapping[pattern]
+        key_column = self.batch_keys.get(pattern)
+        responses: Dict[int, List[Dict[str, Any]]] = {}
+
+        # Template non unibile con IN: una query per ogni insieme distinto di parametri
+        if key_column is None:
+            cache: Dict[Tuple, List[Dict[str, Any]]] = {}
+            for index, params in members:
+                if params not in cache:
+                    results, columns = self.db_manager.execute_query(sql, params, read_only=True)
+                    cache[params] = self.format_response(table_name, results, columns)
+                responses[index] = cache[params]
+            return responses
+
+        # Un'unica query per tutto il gruppo, con la chiave restituita come prima colonna
+        keys = list(dict.fromkeys(params[0] for _, params in members))
+        results, columns = self.db_manager.execute_query(
+            self.build_batch_sql(sql, key_column, len(keys)), tuple(keys), read_only=True
+        )
+        rows_by_key: Dict[str, List[Tuple]] = {}
+        for row in results:
+            rows_by_key.setdefault(self._batch_key(row[0]), []).append(row[1:])
+        for index, params in members:
+            rows = rows_by_key.get(self._batch_key(params[0]), [])
+            responses[index] = self.format_response(table_name, rows, columns[1:])
+        return responses
+
+    def build_batch_sql(self, sql: str, key_column: str, size: int) -> str:
+        """
+        Trasforma la query di un template nella sua versione batch.
+
+        :param sql: Query SQL del template, con il filtro `key_column = ?`.
+        :param key_column: Colonna su cui viene applicato il filtro.
+        :param size: Numero di valori distinti da cercare.
+        :return: Query con `key_column IN (?, ...)` e la chiave come prima colonna selezionata.
+        """
+        placeholders = ", ".join("?" * size)
+        sql = re.sub(rf"\b{re.escape(key_column)}\s*=\s*\?", f"{key_column} IN ({placeholders})", sql, count=1)
+        return re.sub(r"SELECT(\s+DISTINCT)?\s+", lambda m: f"{m.group(0)}{key_column} AS batch_key, ", sql, count=1)
+
+    @staticmethod
+    def _batch_key(value: Any) -> str:
+        """
+        Normalizza una chiave per il confronto tra parametro della domanda e valore restituito dal DB
+        (le collation di MariaDB sono case-insensitive).
+
+        :param value: Valore della chiave.
+        :return: Chiave normalizzata.
+        """
+        return str(value).strip().casefold()
 
     def format_response(self, table_name: str, results: List[Tuple], columns: List) -> List[Dict[str, Any]]:
         """
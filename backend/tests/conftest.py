@@ -0,0 +1,114 @@
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+try:
+    import mariadb
+except ImportError:
+    # Connettore C non installato: bastano le eccezioni, le connessioni sono sostituite dai fake
+    mariadb = types.ModuleType("mariadb")
+    mariadb.Error = type("Error", (Exception,), {})
+    for name in ("OperationalError", "InterfaceError", "IntegrityError", "PoolError"):
+        setattr(mariadb, name, type(name, (mariadb.Error,), {}))
+    mariadb.Connection = mariadb.Cursor = mariadb.ConnectionPool = object
+    sys.modules["mariadb"] = mariadb
+
+
+class FakeServer:
+    """
+    Server MariaDB finto: registra le query ricevute e restituisce righe preimpostate.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.queries = []
+        self.rows = [(0,)]
+        self.columns = ["col"]
+        self.error = None
+        self.down = False
+
+    def run(self, query, params):
+        if self.error is not None:
+            raise self.error
+        self.queries.append((query, params))
+
+
+class FakeCursor:
+    def __init__(self, server):
+        self.server = server
+        self.description = None
+
+    def execute(self, query, params=None):
+        self.server.run(query, params)
+        self.description = [(column,) for column in self.server.columns]
+
+    def executemany(self, query, data):
+        self.server.run(query, data)
+
+    def fetchall(self):
+        return list(self.server.rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self):
+        return FakeCursor(self.server)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def get_connection(self):
+        return FakeConnection(self.server)
+
+    def close(self):
+        self.closed = True
+
+
+class FakePools:
+    """
+    Sostituto di `mariadb.ConnectionPool`: un FakeServer per ogni "host:porta".
+    """
+    def __init__(self):
+        self.servers = {}
+        self.created = []
+
+    def server(self, name):
+        return self.servers.setdefault(name, FakeServer(name))
+
+    def __call__(self, pool_name, pool_size, host, port, **params):
+        server = self.server(f"{host}:{port}")
+        if server.down:
+            raise mariadb.OperationalError(f"{server.name} non raggiungibile")
+        self.created.append(pool_name)
+        return FakePool(server)
+
+
+@pytest.fixture
+def fake_pools(monkeypatch):
+    """
+    Sostituisce i pool di connessioni con server finti: primario su 127.0.0.1:3307,
+    repliche su r1:3306 e r2:3306.
+    """
+    pools = FakePools()
+    monkeypatch.setattr(mariadb, "ConnectionPool", pools)
+    monkeypatch.setenv("DB_HOST", "127.0.0.1")
+    monkeypatch.setenv("DB_PORT", "3307")
+    monkeypatch.setenv("DB_REPLICAS", "r1:3306,r2:3306")
+    return pools
@@ -0,0 +1,86 @@
+import importlib
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+PLAN = '{"query_block": {}}'
+
+
+@pytest.fixture
+def backend(fake_pools):
+    """
+    Modulo backend importato sui server finti, con il DB già inizializzato.
+    """
+    for name in ("127.0.0.1:3307", "r1:3306", "r2:3306"):
+        server = fake_pools.server(name)
+        server.rows = [(PLAN,)]
+        server.columns = ["name"]
+    sys.modules.pop("backend.backend", None)
+    module = importlib.import_module("backend.backend")
+    module.slow_log.threshold_ms = 0
+    return module
+
+
+def explains(pools, name):
+    return [query for query, _ in pools.server(name).queries if query.startswith("EXPLAIN")]
+
+
+def test_slow_search_is_recorded_with_plan_from_same_connection(backend, fake_pools):
+    client = TestClient(backend.app)
+
+    response = client.get("/search/Elenca i film del 2010")
+    assert response.status_code == 200
+
+    [entry] = backend.slow_log.entries()
+    assert entry["question"] == "Elenca i film del 2010"
+    assert entry["template"] == r"Elenca i film del (\d{4})"
+    assert entry["params"] == ["2010"]
+    assert entry["row_count"] == 1
+    assert entry["explain"] == PLAN
+    assert set(entry["timings_ms"]) == {"match_pattern", "execute_query", "format_response", "serialization", "total"}
+
+    # La query è andata alla prima replica: anche l'EXPLAIN, nonostante il round-robin
+    assert entry["connection"] == "r1:3306"
+    assert len(explains(fake_pools, "r1:3306")) == 1
+    assert explains(fake_pools, "r2:3306") == []
+
+
+def test_fast_search_is_not_recorded(backend):
+    backend.slow_log.threshold_ms = 60_000
+    client = TestClient(backend.app)
+
+    assert client.get("/search/Elenca i film del 2010").status_code == 200
+    assert backend.slow_log.entries() == []
+
+
+def test_only_executed_searches_are_recorded(backend):
+    client = TestClient(backend.app)
+
+    assert client.get("/search/Domanda senza senso").status_code == 422
+    assert client.get("/schema_summary").status_code == 200
+    assert backend.slow_log.entries() == []
+
+
+def test_profiling_requires_flag(backend, monkeypatch):
+    client = TestClient(backend.app)
+    headers = {"X-Profile": "1"}
+
+    response = client.get("/search/Elenca i film del 2010", headers=headers)
+    assert "X-Profile-Summary" not in response.headers
+
+    monkeypatch.setattr(backend, "profiling_enabled", True)
+    response = client.get("/search/Elenca i film del 2010", headers=headers)
+    assert "execute_query" in response.headers["X-Profile-Summary"]
+
+
+def test_admin_endpoint_requires_flag(backend, monkeypatch):
+    client = TestClient(backend.app)
+    client.get("/search/Elenca i film del 2010")
+
+    assert client.get("/admin/slow_queries").status_code == 404
+
+    monkeypatch.setattr(backend, "admin_endpoints", True)
+    response = client.get("/admin/slow_queries")
+    assert response.status_code == 200
+    assert response.json()[0]["question"] == "Elenca i film del 2010"
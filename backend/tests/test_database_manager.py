@@ -0,0 +1,95 @@
+import time
+
+import mariadb
+
+from db_manager.DatabaseManager import DatabaseManager
+
+
+def served_by(pools, name):
+    return len(pools.server(name).queries)
+
+
+def test_reads_are_round_robin_across_replicas(fake_pools):
+    manager = DatabaseManager()
+
+    for _ in range(4):
+        manager.execute_query("SELECT 1", read_only=True)
+
+    assert served_by(fake_pools, "r1:3306") == 2
+    assert served_by(fake_pools, "r2:3306") == 2
+    assert served_by(fake_pools, "127.0.0.1:3307") == 0
+
+
+def test_non_read_only_queries_go_to_primary(fake_pools):
+    manager = DatabaseManager()
+
+    manager.execute_query("SELECT 1")
+    manager.execute_db_operation("DELETE FROM movies", [])
+
+    assert served_by(fake_pools, "127.0.0.1:3307") == 2
+    assert served_by(fake_pools, "r1:3306") == 0
+
+
+def test_reads_stick_to_primary_after_write(fake_pools):
+    manager = DatabaseManager()
+
+    manager.execute_db_operation("DELETE FROM movies", [])
+    manager.execute_query("SELECT 1", read_only=True)
+    assert served_by(fake_pools, "127.0.0.1:3307") == 2
+
+    # Finestra read-your-writes scaduta: le letture tornano sulle repliche
+    manager.last_write = time.monotonic() - manager.sticky_window
+    manager.execute_query("SELECT 1", read_only=True)
+    assert served_by(fake_pools, "r1:3306") == 1
+
+
+def test_failed_replica_is_ejected_and_read_falls_back(fake_pools):
+    manager = DatabaseManager()
+    fake_pools.server("r1:3306").error = mariadb.OperationalError("connessione persa")
+
+    manager.execute_query("SELECT 1", read_only=True)
+    assert served_by(fake_pools, "127.0.0.1:3307") == 1
+    assert manager.replicas[0]["ejected_until"] > time.monotonic()
+
+    # Durante il cooldown la replica esclusa viene saltata
+    for _ in range(3):
+        manager.execute_query("SELECT 1", read_only=True)
+    assert served_by(fake_pools, "r2:3306") == 3
+    assert served_by(fake_pools, "127.0.0.1:3307") == 1
+
+
+def test_replica_is_reconnected_after_cooldown(fake_pools):
+    fake_pools.server("r1:3306").down = True
+    manager = DatabaseManager()
+    replica = manager.replicas[0]
+    assert replica["pool"] is None
+
+    fake_pools.server("r1:3306").down = False
+    replica["ejected_until"] = time.monotonic() - 1
+
+    manager.execute_query("SELECT 1", read_only=True)
+    assert served_by(fake_pools, "r1:3306") == 1
+    assert replica["ejected_until"] == 0.0
+    assert not replica["reconnecting"]
+
+
+def test_failed_reconnect_ejects_again(fake_pools):
+    fake_pools.server("r1:3306").down = True
+    manager = DatabaseManager()
+    replica = manager.replicas[0]
+    replica["ejected_until"] = time.monotonic() - 1
+
+    manager.execute_query("SELECT 1", read_only=True)
+    assert served_by(fake_pools, "127.0.0.1:3307") == 1
+    assert replica["ejected_until"] > time.monotonic()
+    assert not replica["reconnecting"]
+
+
+def test_replica_being_reconnected_is_skipped(fake_pools):
+    manager = DatabaseManager()
+    manager.replicas[0]["reconnecting"] = True
+
+    for _ in range(2):
+        manager.execute_query("SELECT 1", read_only=True)
+    assert served_by(fake_pools, "r1:3306") == 0
+    assert served_by(fake_pools, "r2:3306") == 2
@@ -0,0 +1,128 @@
+import re
+import threading
+
+from query_handler.QueryHandler import QueryHandler
+
+
+class FakeDatabaseManager:
+    """
+    DatabaseManager finto: registra le query e restituisce le righe associate al primo frammento SQL trovato.
+    """
+    pool_size = 4
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def execute_query(self, query, params=None, return_columns=True, read_only=False):
+        with self.lock:
+            self.calls.append((" ".join(query.split()), params))
+        for fragment, (rows, columns) in self.responses.items():
+            if fragment in query:
+                return rows, columns
+        return [], ["name"]
+
+
+def properties(results):
+    return [{p["property_name"]: p["property_value"] for p in item["properties"]} for item in results]
+
+
+def test_build_batch_sql_for_every_batch_template():
+    handler = QueryHandler(FakeDatabaseManager())
+    expected = {
+        "year": "SELECT year AS batch_key, title as name,director,year,genre FROM movies WHERE year IN (?, ?)",
+        "genre": "SELECT genre AS batch_key, title as name,director,year,genre FROM movies WHERE genre IN (?, ?)",
+    }
+    for pattern, key_column in handler.batch_keys.items():
+        sql = " ".join(handler.build_batch_sql(handler.query_mapping[pattern][1], key_column, 2).split())
+        if key_column in expected:
+            assert sql == expected[key_column]
+        else:
+            # Template con DISTINCT: la chiave va dopo DISTINCT, il filtro diventa IN
+            assert sql.startswith("SELECT DISTINCT platform AS batch_key, d.name, d.age")
+            assert sql.endswith("WHERE platform IN (?, ?)")
+        assert not re.search(rf"{key_column}\s*=\s*\?", sql)
+
+
+def test_execute_batch_merges_same_template_and_splits_rows():
+    db = FakeDatabaseManager({
+        "year IN": ([(2010, "Inception", "Nolan", 2010, "Fantascienza"),
+                     (2014, "Interstellar", "Nolan", 2014, "Fantascienza"),
+                     (2010, "Shutter Island", "Scorsese", 2010, "Thriller")],
+                    ["batch_key", "name", "director", "year", "genre"]),
+    })
+    handler = QueryHandler(db)
+
+    responses = handler.execute_batch(["Elenca i film del 2010", "Elenca i film del 2014", "Elenca i film del 2019"])
+
+    assert db.calls == [(
+        "SELECT year AS batch_key, title as name,director,year,genre FROM movies WHERE year IN (?, ?, ?)",
+        ("2010", "2014", "2019"),
+    )]
+    assert [r["question"] for r in responses] == ["Elenca i film del 2010", "Elenca i film del 2014", "Elenca i film del 2019"]
+    assert [p["name"] for p in properties(responses[0]["results"])] == ["Inception", "Shutter Island"]
+    assert [p["name"] for p in properties(responses[1]["results"])] == ["Interstellar"]
+    assert responses[2]["results"] == []
+    # La chiave del batch non compare nelle proprietà restituite
+    assert "batch_key" not in properties(responses[0]["results"])[0]
+
+
+def test_execute_batch_handles_duplicate_and_case_variant_keys():
+    db = FakeDatabaseManager({
+        "genre IN": ([("Dramma", "Parasite", "Bong Joon-ho", 2019, "Dramma")],
+                     ["batch_key", "name", "director", "year", "genre"]),
+    })
+    handler = QueryHandler(db)
+
+    responses = handler.execute_batch([
+        "Elenca tutti i film di Dramma.", "Elenca tutti i film di dramma.", "Elenca tutti i film di Dramma.",
+    ])
+
+    # I duplicati esatti sono passati una sola volta, le varianti di maiuscole restano parametri distinti
+    assert db.calls[0][1] == ("Dramma", "dramma")
+    assert all([p["name"] for p in properties(r["results"])] == ["Parasite"] for r in responses)
+
+
+def test_execute_batch_caches_templates_that_cannot_be_merged():
+    db = FakeDatabaseManager({"d.age >=": ([("Inception", "Nolan", 54)], ["name", "director", "age"])})
+    handler = QueryHandler(db)
+
+    responses = handler.execute_batch([
+        "Quali film sono stati fatti da un regista di almeno 50 anni?",
+        "Quali film sono stati fatti da un regista di almeno 60 anni?",
+        "Quali film sono stati fatti da un regista di almeno 50 anni?",
+        "Quali registi hanno fatto più di un film?",
+        "Quali registi hanno fatto più di un film?",
+    ])
+
+    assert sorted(params for _, params in db.calls) == [(), ("50",), ("60",)]
+    assert responses[0]["results"] == responses[2]["results"]
+    assert [p["name"] for p in properties(responses[1]["results"])] == ["Inception"]
+
+
+def test_execute_batch_reports_unrecognised_questions_per_question():
+    db = FakeDatabaseManager()
+    handler = QueryHandler(db)
+
+    responses = handler.execute_batch(["Domanda senza senso", "Elenca i film del 2010"])
+
+    assert responses[0] == {"question": "Domanda senza senso", "results": [], "error": "Query non riconosciuta"}
+    assert responses[1]["error"] is None
+    assert len(db.calls) == 1
+
+
+def test_execute_batch_keeps_input_order_across_groups():
+    db = FakeDatabaseManager({
+        "year IN": ([(2010, "Inception", "Nolan", 2010, "Fantascienza")], ["batch_key", "name", "director", "year", "genre"]),
+        "platform IN": ([("Netflix", "Nolan", 54)], ["batch_key", "name", "age"]),
+    })
+    handler = QueryHandler(db)
+    questions = ["Quali sono i registi presenti su Netflix?", "Elenca i film del 2010", "Quali sono i registi presenti su NOW?"]
+
+    responses = handler.execute_batch(questions)
+
+    assert [r["question"] for r in responses] == questions
+    assert properties(responses[0]["results"]) == [{"name": "Nolan", "age": "54"}]
+    assert properties(responses[1]["results"])[0]["name"] == "Inception"
+    assert responses[2]["results"] == []
@@ -0,0 +1,28 @@
+from profiling.SlowQueryLog import SlowQueryLog, profile_call
+
+
+def test_log_is_bounded_and_newest_first(monkeypatch):
+    monkeypatch.setenv("SLOW_QUERY_LOG_SIZE", "3")
+    log = SlowQueryLog()
+
+    for index in range(5):
+        log.record({"question": f"domanda {index}"})
+
+    assert [entry["question"] for entry in log.entries()] == ["domanda 4", "domanda 3", "domanda 2"]
+    assert all("timestamp" in entry for entry in log.entries())
+
+
+def test_threshold(monkeypatch):
+    monkeypatch.setenv("SLOW_QUERY_THRESHOLD_MS", "200")
+    log = SlowQueryLog()
+
+    assert not log.is_slow(199.9)
+    assert log.is_slow(200)
+
+
+def test_profile_call_returns_result_and_summary():
+    result, summary = profile_call(sorted, [3, 1, 2], limit=5)
+
+    assert result == [1, 2, 3]
+    assert 0 < len(summary) <= 5
+    assert any("sorted" in line for line in summary)